@@ -9,7 +9,8 @@
 # Standard library only.
 
 from typing import Any, Dict, List, Tuple, Iterable, Union, Optional
-import re, copy, json
+import re, json
+from functools import lru_cache
 
 PathT = Tuple[Union[str, int], ...]
 
@@ -27,52 +28,108 @@ def load_state(path: str) -> Dict[str, Any]:
 
 def save_state(state: Dict[str, Any], path: str) -> None:
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2, ensure_ascii=False)
+        f.write(dump_json(state))
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
 
 # Tolerant JSON for DB files that may contain trailing commas or BOMs
 def tolerant_load_json(path: str):
     with open(path, "r", encoding="utf-8", errors="replace") as f:
         raw = f.read()
     raw = raw.lstrip("\ufeff")
-    raw = re.sub(r",\s*([}\]])", r"\1", raw)  # strip trailing commas
+    raw = _TRAILING_COMMA_RE.sub(r"\1", raw)  # strip trailing commas
     return json.loads(raw)
 
 # ---------- Utilities ----------
 
+# Card titles repeat across every selection, so the normalizers are memoized.
+_NONWORD_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+_ARTICLE_RE = re.compile(r"^(the_|a_|an_)")
+# ASCII fast path for norm(): keep lowercased alnum/whitespace, drop the rest.
+_NORM_TABLE = {c: (chr(c).lower() if chr(c).isalnum() or chr(c).isspace() else None) for c in range(128)}
+
+@lru_cache(maxsize=4096)
 def slugify(s: str) -> str:
     s = s.lower()
-    s = re.sub(r"[^\w\s]", " ", s)
-    s = re.sub(r"\s+", "_", s).strip("_")
+    s = _NONWORD_RE.sub(" ", s)
+    s = _WS_RE.sub("_", s).strip("_")
     return s
 
+@lru_cache(maxsize=4096)
 def norm(s: str) -> str:
+    if s.isascii():
+        return s.translate(_NORM_TABLE).strip()
     return "".join(ch.lower() for ch in s if ch.isalnum() or ch.isspace()).strip()
 
+@lru_cache(maxsize=4096)
 def _normalize_article(s: str) -> str:
     s = slugify(s)
-    return re.sub(r"^(the_|a_|an_)", "", s)
+    return _ARTICLE_RE.sub("", s)
 
 # ---------- Structure traversal ----------
 
-def _traverse(node: Any, path: PathT = ()) -> Iterable[Tuple[PathT, Any]]:
-    yield (path, node)
-    if isinstance(node, dict):
-        for k, v in node.items():
-            yield from _traverse(v, path + (k,))
-    elif isinstance(node, list):
-        for i, v in enumerate(node):
-            yield from _traverse(v, path + (i,))
-
-def _get_parent_and_key(root: Any, path: PathT):
-    if not path:
-        raise ValueError("Empty path")
-    parent = root
-    for key in path[:-1]:
-        parent = parent[key]
-    return parent, path[-1]
+def _iter_cards(root: Any) -> Iterable[Tuple[PathT, Dict[str, Any]]]:
+    # Pre-order DFS with an explicit stack, children in container order. Only
+    # containers are stacked (scalars can't hold cards) and only cards are yielded.
+    stack: List[Tuple[PathT, Any]] = [((), root)]
+    while stack:
+        path, node = stack.pop()
+        if type(node) is dict:
+            if _is_card(node):
+                yield (path, node)
+            children = reversed(node.items())
+        elif type(node) is list:
+            children = ((i, node[i]) for i in range(len(node) - 1, -1, -1))
+        else:
+            continue
+        for k, v in children:
+            t = type(v)
+            if t is dict or t is list:
+                stack.append((path + (k,), v))
+
+def _shallow(node: Any) -> Any:
+    t = type(node)
+    if t is dict:
+        return dict(node)
+    if t is list:
+        return list(node)
+    return node
+
+def _copy_on_path(root: Any, path: PathT, fresh: set) -> Any:
+    # Path copying: shallow-copy each container from root along `path`, leaving
+    # untouched siblings shared with the previous state. `root` must already be
+    # a fresh copy; `fresh` holds ids of containers copied for this update, so
+    # several paths can share one new root. Returns the (copied) node at `path`.
+    node = root
+    for key in path:
+        child = node[key]
+        if id(child) not in fresh:
+            child = _shallow(child)
+            node[key] = child
+            fresh.add(id(child))
+        node = child
+    return node
+
+def _navigate_dest(root: Dict[str, Any], dest_path: PathT, fresh: set) -> List[Any]:
+    # Resolve (copying on the way) the destination list, creating missing keys as [].
+    # Int keys below a list are ignored: the caller inserts by index itself.
+    parent: Any = root
+    for k in dest_path:
+        if type(parent) is list:
+            if not isinstance(k, int):
+                raise ValueError("Tried to access key on list while navigating dest path.")
+            continue
+        if k not in parent:
+            parent[k] = []
+            fresh.add(id(parent[k]))
+        parent = _copy_on_path(parent, (k,), fresh)
+    if type(parent) is not list:
+        raise ValueError("Destination is not a list.")
+    return parent
 
 def _is_card(obj: Any) -> bool:
-    return isinstance(obj, dict) and "id" in obj and "title" in obj
+    return type(obj) is dict and "id" in obj and "title" in obj
 
 # ---------- Selection ----------
 
@@ -90,35 +147,23 @@ def select_cards(state: Dict[str, Any], *,
                  zone_hint: Optional[str]=None) -> List[Tuple[PathT, Dict[str, Any]]]:
     if id is None and title is None:
         raise ValueError("Select requires id or title.")
-    results: List[Tuple[PathT, Dict[str, Any]]] = []
-    for path, node in _traverse(state):
-        if not _is_card(node):
-            continue
+    # (path, node, score); id matches carry no title score and sort last.
+    results: List[Tuple[PathT, Dict[str, Any], int]] = []
+    for path, node in _iter_cards(state):
         if zone_hint is not None:
             dotted = ".".join(map(str, path))
             if not dotted.startswith(zone_hint):
                 continue
         if id is not None and node.get("id") == id:
-            results.append((path, node))
+            results.append((path, node, 99))
             continue
         if title is not None:
             score = _title_match_score(title, node.get("title",""))
             if score is not None:
-                results.append((path + ("__score__", score), node))
+                results.append((path, node, score))
     if title and id is None:
-        def sort_key(item):
-            path, _ = item
-            if len(path) >= 2 and path[-2] == "__score__":
-                return path[-1]
-            return 99
-        results.sort(key=sort_key)
-        cleaned: List[Tuple[PathT, Dict[str, Any]]] = []
-        for path, node in results:
-            if len(path) >= 2 and path[-2] == "__score__":
-                path = path[:-2]
-            cleaned.append((path, node))
-        results = cleaned
-    return results
+        results.sort(key=lambda r: r[2])
+    return [(path, node) for path, node, _ in results]
 
 def select_one(state: Dict[str, Any], *, id: Optional[str]=None, title: Optional[str]=None, zone_hint: Optional[str]=None) -> Tuple[PathT, Dict[str, Any]]:
     matches = select_cards(state, id=id, title=title, zone_hint=zone_hint)
@@ -131,31 +176,41 @@ def select_one(state: Dict[str, Any], *, id: Optional[str]=None, title: Optional
 
 # ---------- Elemental mutations ----------
 
+_CARD_STATES = frozenset(("ready","exhausted","cleared","out_of_play","in_hand","discarded"))
+
 def set_card_state(state: Dict[str, Any], selector: Dict[str, str], new_state: str) -> Dict[str, Any]:
-    allowed = {"ready","exhausted","cleared","out_of_play","in_hand","discarded"}
-    if new_state not in allowed:
-        raise ValueError(f"Unsupported state '{new_state}'. Allowed: {sorted(allowed)}")
+    if new_state not in _CARD_STATES:
+        raise ValueError(f"Unsupported state '{new_state}'. Allowed: {sorted(_CARD_STATES)}")
     path, _ = select_one(state, id=selector.get("id"), title=selector.get("title"), zone_hint=selector.get("zone"))
-    new_state_obj = copy.deepcopy(state)
-    parent, key = _get_parent_and_key(new_state_obj, path)
-    parent[key]["state"] = new_state
+    new_state_obj = dict(state)
+    card = _copy_on_path(new_state_obj, path, {id(new_state_obj)})
+    card["state"] = new_state
     return new_state_obj
 
+def _apply_token_deltas(tokens: Dict[str, int], token_delta: Dict[str, int]) -> Dict[str, int]:
+    # Hand-edited state files may hold counts as strings, so coerce both sides.
+    get = tokens.get
+    for t, delta in token_delta.items():
+        n = int(get(t, 0)) + int(delta)
+        if n:
+            tokens[t] = n
+        else:
+            tokens.pop(t, None)
+    return tokens
+
 def add_tokens(state: Dict[str, Any], selector: Dict[str, str], token_delta: Dict[str, int]) -> Dict[str, Any]:
     path, _ = select_one(state, id=selector.get("id"), title=selector.get("title"), zone_hint=selector.get("zone"))
-    new_state_obj = copy.deepcopy(state)
-    parent, key = _get_parent_and_key(new_state_obj, path)
-    tokens = parent[key].setdefault("tokens", {})
-    for t, delta in token_delta.items():
-        tokens[t] = int(tokens.get(t, 0)) + int(delta)
-        if tokens[t] == 0:
-            tokens.pop(t)
+    new_state_obj = dict(state)
+    card = _copy_on_path(new_state_obj, path, {id(new_state_obj)})
+    card["tokens"] = _apply_token_deltas(dict(card.get("tokens") or {}), token_delta)
     return new_state_obj
 
 def move_card(state: Dict[str, Any], selector: Dict[str, str], dest_path: PathT, index: Optional[int]=None) -> Dict[str, Any]:
     src_path, _ = select_one(state, id=selector.get("id"), title=selector.get("title"), zone_hint=selector.get("zone"))
-    new_state_obj = copy.deepcopy(state)
-    src_parent, src_key = _get_parent_and_key(new_state_obj, src_path)
+    new_state_obj = dict(state)
+    fresh = {id(new_state_obj)}
+    src_parent = _copy_on_path(new_state_obj, src_path[:-1], fresh)
+    src_key = src_path[-1]
     card_obj = src_parent[src_key]
     # Remove from source
     if isinstance(src_parent, list):
@@ -164,21 +219,7 @@ def move_card(state: Dict[str, Any], selector: Dict[str, str], dest_path: PathT,
         src_parent.pop(src_key)
     else:
         raise ValueError("Unsupported source container type.")
-    # Navigate destination
-    dest_parent = new_state_obj
-    for k in dest_path:
-        if isinstance(dest_parent, list):
-            if isinstance(k, int):
-                # no-op; we will insert by index later
-                pass
-            else:
-                raise ValueError("Tried to access key on list while navigating dest path.")
-        else:
-            if k not in dest_parent:
-                dest_parent[k] = []
-            dest_parent = dest_parent[k]
-    if not isinstance(dest_parent, list):
-        raise ValueError("Destination is not a list.")
+    dest_parent = _navigate_dest(new_state_obj, dest_path, fresh)
     if index is None:
         dest_parent.append(card_obj)
     else:
@@ -188,21 +229,52 @@ def move_card(state: Dict[str, Any], selector: Dict[str, str], dest_path: PathT,
 def discard_card(state: Dict[str, Any], selector: Dict[str, str], *, ranger_id: str="ranger_1") -> Dict[str, Any]:
     # Remove from current zone and push to rangers[ranger_id].discard_pile with state 'discarded'
     src_path, _ = select_one(state, id=selector.get("id"), title=selector.get("title"), zone_hint=selector.get("zone"))
-    new_state_obj = copy.deepcopy(state)
-    src_parent, src_key = _get_parent_and_key(new_state_obj, src_path)
-    card_obj = src_parent[src_key]
+    new_state_obj = dict(state)
+    fresh = {id(new_state_obj)}
+    card_obj = _copy_on_path(new_state_obj, src_path, fresh)
+    src_parent = _copy_on_path(new_state_obj, src_path[:-1], fresh)
+    src_key = src_path[-1]
     if isinstance(src_parent, list):
         src_parent.pop(src_key)
     elif isinstance(src_parent, dict):
         src_parent.pop(src_key)
     card_obj["state"] = "discarded"
-    r = new_state_obj.setdefault("rangers", {}).setdefault(ranger_id, {})
-    r.setdefault("discard_pile", []).append(card_obj)
+    r = new_state_obj
+    for k, empty in (("rangers", {}), (ranger_id, {}), ("discard_pile", [])):
+        if k not in r:
+            r[k] = empty
+            fresh.add(id(empty))
+        r = _copy_on_path(r, (k,), fresh)
+    r.append(card_obj)
     return new_state_obj
 
 # ---------- DB helpers (optional) ----------
 
+# (exact, space-stripped) normalized title -> first DB item with that title
+DbIndexT = Tuple[Dict[str, Dict[str,Any]], Dict[str, Dict[str,Any]]]
+
+def build_db_index(db: Union[List[Dict[str,Any]], Dict[str,Any]]) -> DbIndexT:
+    exact: Dict[str, Dict[str,Any]] = {}
+    compact: Dict[str, Dict[str,Any]] = {}
+    for item in (db if isinstance(db, list) else db.values()):
+        if not isinstance(item, dict):
+            continue
+        n = norm(item.get("title") or item.get("name") or "")
+        exact.setdefault(n, item)
+        compact.setdefault(n.replace(" ", ""), item)
+    return exact, compact
+
+def find_in_index_by_title(index: DbIndexT, title: str) -> Optional[Dict[str,Any]]:
+    exact, compact = index
+    target = norm(title)
+    hit = exact.get(target)
+    if hit is None:
+        # retry space-stripped
+        hit = compact.get(target.replace(" ", ""))
+    return hit
+
 def find_in_db_by_title(db: Union[List[Dict[str,Any]], Dict[str,Any]], title: str) -> Optional[Dict[str,Any]]:
+    # One-off lookup; for repeated lookups build_db_index once and use find_in_index_by_title.
     it = db if isinstance(db, list) else list(db.values())
     target = norm(title)
     for item in it:
@@ -242,34 +314,31 @@ def _apply_enters_play_with(instance: Dict[str,Any], source: Dict[str,Any]) -> N
         if t:
             instance["tokens"][t] = int(n or 0)  # exact, even zero
     elif isinstance(epw, list):
-        # reset then set each listed token
-        instance["tokens"].clear()
+        # replace with exactly the listed tokens
+        seeded: Dict[str, int] = {}
         for entry in epw:
             if not isinstance(entry, dict): 
                 continue
             t = (entry.get("type") or entry.get("token") or entry.get("name") or "").strip().lower()
             n = entry.get("count") if entry.get("count") is not None else entry.get("amount")
             if t:
-                instance["tokens"][t] = int(n or 0)
+                seeded[t] = int(n or 0)
+        instance["tokens"] = seeded
 
 # Convenience: add a DB card to a zone
-def add_card_from_db(state: Dict[str,Any], *, db: Union[List[Dict[str,Any]], Dict[str,Any]], title: str, dest_path: PathT, fallback_type: str="card", card_state: str="ready") -> Dict[str,Any]:
-    src = find_in_db_by_title(db, title)
+def add_card_from_db(state: Dict[str,Any], *, db: Optional[Union[List[Dict[str,Any]], Dict[str,Any]]]=None, title: str, dest_path: PathT, fallback_type: str="card", card_state: str="ready", db_index: Optional[DbIndexT]=None) -> Dict[str,Any]:
+    # Pass db_index (from build_db_index) instead of db to skip the per-call DB scan.
+    if db_index is not None:
+        src = find_in_index_by_title(db_index, title)
+    elif db is not None:
+        src = find_in_db_by_title(db, title)
+    else:
+        raise ValueError("add_card_from_db requires db or db_index.")
     if not src:
         raise ValueError(f"Card titled '{title}' not found in provided DB.")
     inst = build_instance_from_db(src, fallback_type=fallback_type, state=card_state)
-    new_state = copy.deepcopy(state)
-    # Navigate destination
-    dest_parent = new_state
-    for k in dest_path:
-        if isinstance(dest_parent, list):
-            if not isinstance(k, int):
-                raise ValueError("Tried to access key on list while navigating dest path.")
-        else:
-            if k not in dest_parent:
-                dest_parent[k] = []
-            dest_parent = dest_parent[k]
-    if not isinstance(dest_parent, list):
-        raise ValueError("Destination is not a list.")
+    new_state = dict(state)
+    fresh = {id(new_state)}
+    dest_parent = _navigate_dest(new_state, dest_path, fresh)
     dest_parent.append(inst)
     return new_state